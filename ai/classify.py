@@ -1,8 +1,10 @@
 import google.generativeai as genai
 import config
 import json
+import logging
 
 genai.configure(api_key=config.GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
 def classify_category(complaint_text):
     """
@@ -51,7 +53,7 @@ Return ONLY the category name, nothing else."""
         return category
         
     except Exception as e:
-        print(f"Error classifying complaint: {e}")
+        logger.error(f"Error classifying complaint: {e}")
         return classify_category_fallback(complaint_text)
 
 
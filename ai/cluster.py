@@ -174,8 +174,9 @@ def merge_clusters(cluster_id1, cluster_id2):
         tuple: (success: bool, error_message: str or None)
     """
     try:
-        cluster1 = IssueCluster.get_by_id(cluster_id1)
-        cluster2 = IssueCluster.get_by_id(cluster_id2)
+        clusters = IssueCluster.get_many([cluster_id1, cluster_id2])
+        cluster1 = clusters.get(cluster_id1)
+        cluster2 = clusters.get(cluster_id2)
         
         if not cluster1:
             return False, f"Cluster {cluster_id1} not found"
@@ -286,10 +287,10 @@ def recalculate_all_clusters():
         tuple: (success: bool, reassigned_count: int)
     """
     try:
-        complaints = Complaint.get_all()
         reassigned_count = 0
         
-        for complaint in complaints:
+        # Page through complaints rather than holding the whole collection in memory
+        for complaint in Complaint.iter_all():
             try:
                 old_cluster = complaint.get('cluster_id')
                 new_cluster = assign_cluster(complaint)
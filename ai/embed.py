@@ -1,8 +1,10 @@
 import google.generativeai as genai
 import numpy as np
 import config
+import logging
 
 genai.configure(api_key=config.GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
 def generate_embedding(text):
     """
@@ -25,7 +27,7 @@ def generate_embedding(text):
         return embedding
         
     except Exception as e:
-        print(f"Error generating embedding: {e}")
+        logger.error(f"Error generating embedding: {e}")
         # Return zero vector if API fails
         return np.zeros(config.EMBEDDING_DIMENSION)
 
@@ -1,8 +1,10 @@
 import google.generativeai as genai
 import config
+import logging
 
 # Configure Gemini API
 genai.configure(api_key=config.GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
 def rewrite_complaint(raw_text):
     """
@@ -36,7 +38,7 @@ Rewritten formal complaint:"""
         return rewritten
         
     except Exception as e:
-        print(f"Error rewriting complaint: {e}")
+        logger.error(f"Error rewriting complaint: {e}")
         # Return original if API fails
         return raw_text
 
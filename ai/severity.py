@@ -2,10 +2,93 @@ import google.generativeai as genai
 import config
 import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 genai.configure(api_key=config.GEMINI_API_KEY)
 logger = logging.getLogger(__name__)
 
+
+def _terms_re(terms):
+    """Compile terms into one alternation; .search() matches like any(t in text)"""
+    return re.compile('|'.join(re.escape(term) for term in terms))
+
+
+# CRITICAL keywords that should ALWAYS be high severity
+CRITICAL_TERMS = (
+    # Medical emergencies
+    'hospital', 'hospitalized', 'hospitalization', 'admitted to hospital',
+    'emergency room', 'er visit', 'ambulance', 'medical emergency',
+    'severe injury', 'injured badly', 'broken bone', 'fracture',
+    'bleeding', 'blood', 'unconscious', 'fainted', 'collapsed',
+    'poisoning', 'poison', 'food poisoning', 'sick multiple students',
+    'vomiting', 'severe pain', 'chest pain', 'difficulty breathing',
+    'allergic reaction', 'anaphylaxis', 'seizure', 'stroke',
+    
+    # Safety hazards
+    'fire', 'electrical shock', 'electrocuted', 'gas leak',
+    'carbon monoxide', 'structural damage', 'building collapse',
+    'ceiling falling', 'wall crack', 'unsafe building',
+    
+    # Violence and threats
+    'assault', 'attacked', 'violence', 'threat', 'threatened',
+    'harassment', 'sexual harassment', 'abuse', 'molested',
+    
+    # Severe contamination
+    'contaminated food', 'rotten food', 'maggots in food',
+    'rat in food', 'cockroach in food', 'insect in food',
+    'moldy food', 'spoiled food', 'food made me sick',
+    
+    # Critical failures
+    'no water for days', 'no electricity for days',
+    'no heating in winter', 'no cooling in summer',
+    'toilet overflow', 'sewage backup',
+    
+    # Mental health crises
+    'suicidal', 'suicide', 'mental breakdown', 'panic attack',
+    'severe anxiety', 'severe depression'
+)
+
+# Medical facility mention + urgency wording also counts as critical
+MEDICAL_FACILITY_TERMS = ('hospital', 'clinic', 'medical center', 'doctor', 'er', 'emergency')
+CRITICAL_URGENCY_TERMS = ('urgent', 'emergency', 'critical', 'serious', 'severe', 'immediately')
+
+# Verification score: points per matching term
+HEALTH_TERMS = ('hospital', 'injury', 'sick', 'ill', 'disease', 'infection',
+                'pain', 'medical', 'health', 'poisoning', 'vomit', 'fever')
+SAFETY_TERMS = ('danger', 'unsafe', 'hazard', 'fire', 'electrical',
+                'shock', 'gas', 'toxic', 'collapse', 'falling')
+URGENCY_TERMS = ('urgent', 'emergency', 'immediate', 'critical', 'serious',
+                 'severe', 'asap', 'now', 'today')
+
+# Verification score: flat points if any term matches
+PLURAL_TERMS = ('students', 'everyone', 'all of us', 'many people', 'several',
+                'multiple', 'whole floor', 'entire')
+REPEATED_TERMS = ('again', 'still', 'continue', 'repeated', 'multiple times',
+                  'many times', 'keep', 'ongoing')
+IGNORED_TERMS = ('ignored', 'no response', 'didn\'t respond', 'not addressed',
+                 'no action', 'nothing done')
+TIME_TERMS = ('days', 'weeks', 'month', 'long time', 'since')
+ESSENTIAL_TERMS = ('water', 'electricity', 'power', 'heating', 'cooling',
+                   'wifi', 'internet', 'food', 'bathroom', 'toilet')
+NON_FUNCTIONAL_TERMS = ('not working', 'broken', 'no', 'without', 'stopped', 'failed')
+
+_CRITICAL_RE = _terms_re(CRITICAL_TERMS)
+_MEDICAL_FACILITY_RE = _terms_re(MEDICAL_FACILITY_TERMS)
+_CRITICAL_URGENCY_RE = _terms_re(CRITICAL_URGENCY_TERMS)
+_PLURAL_RE = _terms_re(PLURAL_TERMS)
+_REPEATED_RE = _terms_re(REPEATED_TERMS)
+_IGNORED_RE = _terms_re(IGNORED_TERMS)
+_TIME_RE = _terms_re(TIME_TERMS)
+_ESSENTIAL_RE = _terms_re(ESSENTIAL_TERMS)
+_NON_FUNCTIONAL_RE = _terms_re(NON_FUNCTIONAL_TERMS)
+
+# explain_severity() reason triggers
+_EXPLAIN_MEDICAL_RE = _terms_re(('hospital', 'injury', 'emergency'))
+_EXPLAIN_SAFETY_RE = _terms_re(('danger', 'unsafe', 'fire', 'hazard'))
+_EXPLAIN_HEALTH_RISK_RE = _terms_re(('poison', 'contaminated', 'sick'))
+_EXPLAIN_DISRUPTION_RE = _terms_re(('problem', 'issue', 'broken'))
+_EXPLAIN_QUALITY_RE = _terms_re(('delay', 'slow', 'poor'))
+
 def detect_severity(complaint_text):
     """
     Detect severity level of a complaint using multi-layer AI analysis.
@@ -116,52 +199,14 @@ def detect_critical_keywords(complaint_text):
     """
     text_lower = complaint_text.lower()
     
-    # CRITICAL keywords that should ALWAYS be high severity
-    critical_terms = [
-        # Medical emergencies
-        'hospital', 'hospitalized', 'hospitalization', 'admitted to hospital',
-        'emergency room', 'er visit', 'ambulance', 'medical emergency',
-        'severe injury', 'injured badly', 'broken bone', 'fracture',
-        'bleeding', 'blood', 'unconscious', 'fainted', 'collapsed',
-        'poisoning', 'poison', 'food poisoning', 'sick multiple students',
-        'vomiting', 'severe pain', 'chest pain', 'difficulty breathing',
-        'allergic reaction', 'anaphylaxis', 'seizure', 'stroke',
-        
-        # Safety hazards
-        'fire', 'electrical shock', 'electrocuted', 'gas leak',
-        'carbon monoxide', 'structural damage', 'building collapse',
-        'ceiling falling', 'wall crack', 'unsafe building',
-        
-        # Violence and threats
-        'assault', 'attacked', 'violence', 'threat', 'threatened',
-        'harassment', 'sexual harassment', 'abuse', 'molested',
-        
-        # Severe contamination
-        'contaminated food', 'rotten food', 'maggots in food',
-        'rat in food', 'cockroach in food', 'insect in food',
-        'moldy food', 'spoiled food', 'food made me sick',
-        
-        # Critical failures
-        'no water for days', 'no electricity for days',
-        'no heating in winter', 'no cooling in summer',
-        'toilet overflow', 'sewage backup',
-        
-        # Mental health crises
-        'suicidal', 'suicide', 'mental breakdown', 'panic attack',
-        'severe anxiety', 'severe depression'
-    ]
-    
-    for term in critical_terms:
-        if term in text_lower:
-            logger.info(f"Critical keyword detected: '{term}'")
-            return 'high'
+    match = _CRITICAL_RE.search(text_lower)
+    if match:
+        logger.info(f"Critical keyword detected: '{match.group()}'")
+        return 'high'
     
     # Check for medical facility mentions
-    medical_facilities = ['hospital', 'clinic', 'medical center', 'doctor', 'er', 'emergency']
-    urgency_terms = ['urgent', 'emergency', 'critical', 'serious', 'severe', 'immediately']
-    
-    has_medical = any(term in text_lower for term in medical_facilities)
-    has_urgency = any(term in text_lower for term in urgency_terms)
+    has_medical = _MEDICAL_FACILITY_RE.search(text_lower) is not None
+    has_urgency = _CRITICAL_URGENCY_RE.search(text_lower) is not None
     
     if has_medical and has_urgency:
         logger.info("Medical + urgency combination detected")
@@ -184,52 +229,32 @@ def calculate_severity_score(complaint_text):
     score = 0
     
     # Health impact indicators (3 points each)
-    health_terms = ['hospital', 'injury', 'sick', 'ill', 'disease', 'infection', 
-                   'pain', 'medical', 'health', 'poisoning', 'vomit', 'fever']
-    score += sum(3 for term in health_terms if term in text_lower)
+    score += sum(3 for term in HEALTH_TERMS if term in text_lower)
     
     # Safety hazards (4 points each)
-    safety_terms = ['danger', 'unsafe', 'hazard', 'fire', 'electrical', 
-                   'shock', 'gas', 'toxic', 'collapse', 'falling']
-    score += sum(4 for term in safety_terms if term in text_lower)
+    score += sum(4 for term in SAFETY_TERMS if term in text_lower)
     
     # Urgency indicators (2 points each)
-    urgency_terms = ['urgent', 'emergency', 'immediate', 'critical', 'serious', 
-                    'severe', 'asap', 'now', 'today']
-    score += sum(2 for term in urgency_terms if term in text_lower)
+    score += sum(2 for term in URGENCY_TERMS if term in text_lower)
     
     # Multiple people affected (3 points)
-    plural_terms = ['students', 'everyone', 'all of us', 'many people', 'several', 
-                   'multiple', 'whole floor', 'entire']
-    if any(term in text_lower for term in plural_terms):
+    if _PLURAL_RE.search(text_lower):
         score += 3
     
     # Repeated issues (2 points)
-    repeated_terms = ['again', 'still', 'continue', 'repeated', 'multiple times', 
-                     'many times', 'keep', 'ongoing']
-    if any(term in text_lower for term in repeated_terms):
+    if _REPEATED_RE.search(text_lower):
         score += 2
     
     # Ignored complaints (2 points)
-    ignored_terms = ['ignored', 'no response', 'didn\'t respond', 'not addressed', 
-                    'no action', 'nothing done']
-    if any(term in text_lower for term in ignored_terms):
+    if _IGNORED_RE.search(text_lower):
         score += 2
     
     # Time sensitivity (2 points)
-    time_terms = ['days', 'weeks', 'month', 'long time', 'since']
-    if any(term in text_lower for term in time_terms):
+    if _TIME_RE.search(text_lower):
         score += 2
     
     # Essential services (3 points)
-    essential_terms = ['water', 'electricity', 'power', 'heating', 'cooling', 
-                      'wifi', 'internet', 'food', 'bathroom', 'toilet']
-    non_functional = ['not working', 'broken', 'no', 'without', 'stopped', 'failed']
-    
-    has_essential = any(term in text_lower for term in essential_terms)
-    has_failure = any(term in text_lower for term in non_functional)
-    
-    if has_essential and has_failure:
+    if _ESSENTIAL_RE.search(text_lower) and _NON_FUNCTIONAL_RE.search(text_lower):
         score += 3
     
     # Cap score at 10
@@ -325,19 +350,21 @@ def detect_batch_severity(complaint_texts):
     """
     Detect severity for multiple complaints in batch.
     
+    Each complaint needs its own Gemini round trip, so the calls are
+    issued concurrently rather than one after another.
+    
     Args:
         complaint_texts (list): List of complaint texts
         
     Returns:
-        list: List of severity levels
+        list: List of severity levels, in the same order as the input
     """
-    severities = []
-    
-    for text in complaint_texts:
-        severity = detect_severity(text)
-        severities.append(severity)
+    complaint_texts = list(complaint_texts)
+    if not complaint_texts:
+        return []
     
-    return severities
+    with ThreadPoolExecutor(max_workers=min(8, len(complaint_texts))) as executor:
+        return list(executor.map(detect_severity, complaint_texts))
 
 
 def explain_severity(complaint_text, severity):
@@ -356,19 +383,19 @@ def explain_severity(complaint_text, severity):
     
     # Check what triggered this severity
     if severity == 'high':
-        if any(term in text_lower for term in ['hospital', 'injury', 'emergency']):
+        if _EXPLAIN_MEDICAL_RE.search(text_lower):
             reasons.append("Health/medical emergency detected")
-        if any(term in text_lower for term in ['danger', 'unsafe', 'fire', 'hazard']):
+        if _EXPLAIN_SAFETY_RE.search(text_lower):
             reasons.append("Safety hazard identified")
-        if any(term in text_lower for term in ['poison', 'contaminated', 'sick']):
+        if _EXPLAIN_HEALTH_RISK_RE.search(text_lower):
             reasons.append("Health risk to students")
         if calculate_severity_score(text_lower) >= 8:
             reasons.append("High severity score based on multiple factors")
     
     elif severity == 'medium':
-        if any(term in text_lower for term in ['problem', 'issue', 'broken']):
+        if _EXPLAIN_DISRUPTION_RE.search(text_lower):
             reasons.append("Service disruption or quality issue")
-        if any(term in text_lower for term in ['delay', 'slow', 'poor']):
+        if _EXPLAIN_QUALITY_RE.search(text_lower):
             reasons.append("Performance or quality concerns")
         if calculate_severity_score(text_lower) >= 4:
             reasons.append("Moderate severity score")
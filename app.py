@@ -1,15 +1,21 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
 from datetime import datetime, timedelta
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from werkzeug.exceptions import HTTPException
 
 # ========== IMPORT CONFIG FIRST ==========
 import config
 
 # ========== IMPORT DATABASE MODELS ==========
-from database.firebase_models import User, Complaint, IssueCluster, Category, initialize_categories
+from database.firebase_models import (
+    User, Complaint, IssueCluster, Category, initialize_categories, DEFAULT_CATEGORIES
+)
 
 # Helper function to add get_all to User class
 def _get_all_users():
@@ -23,7 +29,8 @@ def _get_all_users():
             data['id'] = doc.id
             users.append(data)
         return users
-    except:
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error getting all users: {e}")
         return []
 
 User.get_all = staticmethod(_get_all_users)
@@ -36,7 +43,7 @@ from ai.embed import generate_embedding
 from ai.cluster import assign_cluster, update_clusters
 
 # ========== IMPORT UTILITIES ==========
-from utils.firebase_helpers import get_dashboard_stats, get_recent_complaints
+from utils.firebase_helpers import get_dashboard_stats, get_dashboard_bundle, invalidate_dashboard_stats
 
 # ========== IMPORT AUTH ==========
 from auth.auth import (
@@ -46,6 +53,26 @@ from auth.auth import (
     sanitize_input, check_rate_limit
 )
 
+# ========== CONFIGURE LOGGING ==========
+# Request threads only enqueue records; a background listener does the
+# actual stderr writes so slow log I/O never blocks a request
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Pass the message through untouched; the listener's handler applies the real format
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
+logging.basicConfig(
+    level=logging.INFO,
+    handlers=[_queue_handler]
+)
+logger = logging.getLogger(__name__)
+
 # ========== CREATE FLASK APP ==========
 app = Flask(__name__)
 app.config.from_object(config)
@@ -65,9 +92,9 @@ limiter = Limiter(
 
 limiter.exempt(lambda: request.path.startswith('/static/'))
 
-print(f"✓ Rate limiter initialized")
-print(f"✓ Login limit: {config.AUTH_RATE_LIMIT_LOGIN}")
-print(f"✓ Register limit: {config.AUTH_RATE_LIMIT_REGISTER}")
+logger.info("✓ Rate limiter initialized")
+logger.info(f"✓ Login limit: {config.AUTH_RATE_LIMIT_LOGIN}")
+logger.info(f"✓ Register limit: {config.AUTH_RATE_LIMIT_REGISTER}")
 
 # ========== SESSION CONFIGURATION ==========
 app.secret_key = config.SECRET_KEY
@@ -84,9 +111,9 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Strict'
 app.config['SESSION_COOKIE_SECURE'] = True     
 app.config['SESSION_COOKIE_DOMAIN'] = None 
 
-print(f"✓ Secret key configured: {app.secret_key[:10]}...")
-print(f"✓ Session lifetime: {app.config['PERMANENT_SESSION_LIFETIME']}")
-print(f"✓ CSRF Protection enabled")
+logger.info(f"✓ Secret key configured: {app.secret_key[:10]}...")
+logger.info(f"✓ Session lifetime: {app.config['PERMANENT_SESSION_LIFETIME']}")
+logger.info("✓ CSRF Protection enabled")
 
 # ========== JINJA GLOBALS ==========
 app.jinja_env.globals.update(
@@ -111,14 +138,7 @@ from auth.firebase_auth import firebase_bp
 limiter.limit(config.AUTH_RATE_LIMIT_FIREBASE)(firebase_bp)
 app.register_blueprint(firebase_bp)
 csrf.exempt(firebase_bp)
-print(f"✓ Firebase blueprint registered with rate limit: {config.AUTH_RATE_LIMIT_FIREBASE}")
-
-# ========== CONFIGURE LOGGING ==========
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+logger.info(f"✓ Firebase blueprint registered with rate limit: {config.AUTH_RATE_LIMIT_FIREBASE}")
 
 # ========== INITIALIZE CATEGORIES ==========
 try:
@@ -180,7 +200,20 @@ def handle_csrf_error(e):
 
 @app.errorhandler(Exception)
 def handle_exception(e):
+    """App-wide fallback for uncaught errors (only runs when something raises)"""
+    # Plain HTTP errors (405, 400, ...) keep their own status code
+    if isinstance(e, HTTPException):
+        return e
+    
     logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
+    
+    # Check if it's an API request (JSON)
+    if request.path.startswith('/api/') or request.is_json:
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+    
     return render_template('error.html', error_code=500, error_message="An unexpected error occurred"), 500
 
 
@@ -617,15 +650,7 @@ def submit():
                 logger.error("Categories still empty after initialization")
                 # Emergency fallback
                 return render_template('submit.html', 
-                                     categories=[
-                                         {'name': 'Mess Food Quality'},
-                                         {'name': 'Campus Wi-Fi'},
-                                         {'name': 'Medical Center'},
-                                         {'name': 'Placement/CDC'},
-                                         {'name': 'Faculty Concerns'},
-                                         {'name': 'Hostel Maintenance'},
-                                         {'name': 'Other'}
-                                     ], 
+                                     categories=[{'name': name} for name in DEFAULT_CATEGORIES], 
                                      error=None)
             
             logger.info(f"Loaded {len(categories)} categories for form")
@@ -635,15 +660,7 @@ def submit():
             logger.error(f"Error in submit GET: {str(e)}")
             # Emergency fallback with hardcoded categories
             return render_template('submit.html', 
-                                 categories=[
-                                     {'name': 'Mess Food Quality'},
-                                     {'name': 'Campus Wi-Fi'},
-                                     {'name': 'Medical Center'},
-                                     {'name': 'Placement/CDC'},
-                                     {'name': 'Faculty Concerns'},
-                                     {'name': 'Hostel Maintenance'},
-                                     {'name': 'Other'}
-                                 ], 
+                                 categories=[{'name': name} for name in DEFAULT_CATEGORIES], 
                                  error="Error loading form. Using default categories.")
 
     # POST request handling (rest remains the same)
@@ -683,7 +700,8 @@ def submit():
             # AI Processing
             try:
                 rewritten_text = rewrite_complaint(raw_text)
-            except:
+            except Exception as e:
+                logger.warning(f"Rewrite failed, using raw text: {e}")
                 rewritten_text = raw_text
 
             try:
@@ -691,17 +709,20 @@ def submit():
                     category_name = classify_category(rewritten_text)
                 if not Category.get_by_name(category_name):
                     category_name = 'Other'
-            except:
+            except Exception as e:
+                logger.warning(f"Classification failed, using 'Other': {e}")
                 category_name = 'Other'
 
             try:
                 severity = detect_severity(rewritten_text)
-            except:
+            except Exception as e:
+                logger.warning(f"Severity detection failed, using 'medium': {e}")
                 severity = 'medium'
 
             try:
                 embedding = generate_embedding(rewritten_text)
-            except:
+            except Exception as e:
+                logger.warning(f"Embedding generation failed: {e}")
                 embedding = None
 
             # CRITICAL: Create complaint with user_id
@@ -740,6 +761,9 @@ def submit():
                 update_clusters()
             except Exception as e:
                 logger.error(f"Cluster update error: {str(e)}")
+            
+            # New complaint (and possibly new clusters): recompute stats on next view
+            invalidate_dashboard_stats()
 
             flash('Complaint submitted successfully!', 'success')
             return redirect(url_for('success'))
@@ -768,36 +792,12 @@ def dashboard():
     try:
         logger.info("Loading dashboard...")
         
-        # Get statistics
-        stats = get_dashboard_stats()
-        logger.info(f"Stats: {stats.get('total_complaints', 0)} complaints")
-        
-        # Get all clusters
-        clusters = IssueCluster.get_all(limit=20)
-        logger.info(f"Clusters: {len(clusters)}")
-        
-        # Add complaint details to each cluster
-        for cluster in clusters:
-            try:
-                complaints = Complaint.get_by_cluster(cluster['id'])
-                cluster['complaints'] = complaints
-                logger.info(f"Cluster {cluster['id']}: {len(complaints)} complaints")
-            except Exception as e:
-                logger.error(f"Error getting complaints for cluster {cluster['id']}: {e}")
-                cluster['complaints'] = []
-        
-        # Get recent complaints directly
-        recent = get_recent_complaints(limit=10)
-        logger.info(f"Recent complaints: {len(recent)}")
-        
-        # Convert timestamp strings to datetime objects for template
-        for complaint in recent:
-            if complaint.get('timestamp'):
-                if isinstance(complaint['timestamp'], str):
-                    try:
-                        complaint['timestamp'] = datetime.fromisoformat(complaint['timestamp'].replace('Z', '+00:00'))
-                    except:
-                        complaint['timestamp'] = datetime.utcnow()
+        # Statistics, top clusters (with complaints) and recent complaints,
+        # loaded concurrently and cached together
+        bundle = get_dashboard_bundle(recent_limit=10, cluster_limit=20)
+        stats = bundle['stats']
+        clusters = bundle['clusters']
+        recent = bundle['recent']
         
         # Log what we're sending to template
         logger.info(f"Rendering dashboard with:")
@@ -835,11 +835,6 @@ def cluster_detail(cluster_id):
         
         complaints = Complaint.get_by_cluster(cluster_id)
         
-        # Convert timestamp strings to datetime objects for template
-        for c in complaints:
-            if isinstance(c.get('timestamp'), str):
-                c['timestamp'] = datetime.fromisoformat(c['timestamp'].replace('Z', '+00:00'))
-        
         return render_template('cluster_detail.html', cluster=cluster, complaints=complaints)
     except Exception as e:
         logger.error(f"Cluster detail error: {e}")
@@ -871,6 +866,8 @@ def upvote_complaint(complaint_id):
         
         if upvotes is not None:
             logger.info(f"Upvoted complaint {complaint_id}, new count: {upvotes}")
+            # Cached dashboard page data shows upvote counts
+            invalidate_dashboard_stats()
             return jsonify({
                 'success': True, 
                 'upvotes': upvotes
@@ -899,7 +896,8 @@ def api_rewrite():
             return jsonify({'error': 'No text provided'}), 400
         rewritten = rewrite_complaint(raw_text)
         return jsonify({'rewritten_text': rewritten})
-    except:
+    except Exception as e:
+        logger.error(f"API rewrite error: {e}", exc_info=True)
         return jsonify({'error': 'Rewrite failed'}), 500
 
 @app.route('/api/stats')
@@ -907,7 +905,8 @@ def api_stats():
     try:
         stats = get_dashboard_stats()
         return jsonify(stats)
-    except:
+    except Exception as e:
+        logger.error(f"API stats error: {e}", exc_info=True)
         return jsonify({'error': 'Stats fetch failed'}), 500
 
 # ============================================================================
@@ -11,8 +11,11 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from flask import session, redirect, url_for, flash, request
 import re
+import logging
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
 
 def hash_password(password):
     """Hash a password for storing."""
@@ -118,7 +121,7 @@ def login_user(user):
         "is_admin": user.get("is_admin", False)
     }
     
-    print(f"✓ User logged in successfully: {user.get('email')}")
+    logger.info(f"✓ User logged in successfully: {user.get('email')}")
 
 
 def logout_user():
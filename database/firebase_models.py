@@ -10,6 +10,7 @@ import numpy as np
 import logging
 import os
 from dotenv import load_dotenv
+from utils.cache import TTLCache
 
 # Load environment variables
 load_dotenv()
@@ -59,6 +60,56 @@ COMPLAINTS_COLLECTION = 'complaints'
 CATEGORIES_COLLECTION = 'categories'
 CLUSTERS_COLLECTION = 'issue_clusters'
 
+# Categories seeded on first run and used as the submit form fallback
+DEFAULT_CATEGORIES = (
+    'Mess Food Quality',
+    'Campus Wi-Fi',
+    'Medical Center',
+    'Placement/CDC',
+    'Faculty Concerns',
+    'Hostel Maintenance',
+    'Other'
+)
+
+
+def _count(query):
+    """Run a server-side COUNT aggregation so no documents are downloaded"""
+    result = query.count().get()
+    return int(result[0][0].value)
+
+
+def _paginate(query, page_size):
+    """Yield the query's documents one page at a time using start_after cursors"""
+    query = query.order_by('__name__').limit(page_size)
+    last_doc = None
+    while True:
+        page_query = query.start_after(last_doc) if last_doc else query
+        page = list(page_query.stream())
+        yield from page
+        if len(page) < page_size:
+            break
+        last_doc = page[-1]
+
+
+def _coerce_ts(value):
+    """Normalize a stored timestamp (datetime or legacy ISO string) to a datetime or None"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return None
+
+
+def _complaint_from_doc(doc):
+    """Convert a complaint snapshot to a dict with its id and a datetime timestamp"""
+    data = doc.to_dict()
+    data['id'] = doc.id
+    data['timestamp'] = _coerce_ts(data.get('timestamp'))
+    return data
+
 # ============================================================================
 # USER OPERATIONS
 # ============================================================================
@@ -144,12 +195,27 @@ class User:
         """Update last login timestamp"""
         return User.update(user_id, {'last_login': datetime.utcnow()})
     
+    @staticmethod
+    def iter_all(page_size=500, strict=False):
+        """Yield every user one page at a time instead of loading them all
+        
+        strict=True raises Firestore errors instead of logging them and stopping.
+        """
+        try:
+            for doc in _paginate(db.collection(USERS_COLLECTION), page_size):
+                data = doc.to_dict()
+                data['id'] = doc.id
+                yield data
+        except Exception as e:
+            if strict:
+                raise
+            logger.error(f"Error iterating users: {e}")
+    
     @staticmethod
     def get_complaint_count(user_id):
         """Get complaint count for user"""
         try:
-            complaints = db.collection(COMPLAINTS_COLLECTION).where('user_id', '==', user_id).get()
-            return len(list(complaints))
+            return _count(db.collection(COMPLAINTS_COLLECTION).where('user_id', '==', user_id))
         except Exception as e:
             logger.error(f"Error getting complaint count: {e}")
             return 0
@@ -162,12 +228,7 @@ class User:
             if limit:
                 query = query.limit(limit)
             
-            complaints = []
-            for doc in query.stream():
-                data = doc.to_dict()
-                data['id'] = doc.id
-                complaints.append(data)
-            return complaints
+            return [_complaint_from_doc(doc) for doc in query.stream()]
         except Exception as e:
             logger.error(f"Error getting user complaints: {e}")
             return []
@@ -202,32 +263,53 @@ class Complaint:
         try:
             doc = db.collection(COMPLAINTS_COLLECTION).document(complaint_id).get()
             if doc.exists:
-                data = doc.to_dict()
-                data['id'] = doc.id
-                return data
+                return _complaint_from_doc(doc)
             return None
         except Exception as e:
             logger.error(f"Error getting complaint: {e}")
             return None
     
     @staticmethod
-    def get_all(limit=None):
-        """Get all complaints"""
+    def get_by_user_id(user_id):
+        """Get complaints submitted by a user (single-field index, unordered)"""
+        try:
+            query = db.collection(COMPLAINTS_COLLECTION).where('user_id', '==', user_id)
+            
+            return [_complaint_from_doc(doc) for doc in query.stream()]
+        except Exception as e:
+            logger.error(f"Error getting complaints by user: {e}")
+            return []
+    
+    @staticmethod
+    def get_all(limit=None, fields=None, strict=False):
+        """Get all complaints, newest first
+        
+        Pass `fields` to download only those fields (a Firestore projection).
+        strict=True raises Firestore errors instead of returning an empty list.
+        """
         try:
             query = db.collection(COMPLAINTS_COLLECTION).order_by('timestamp', direction=firestore.Query.DESCENDING)
+            if fields:
+                query = query.select(fields)
             if limit:
                 query = query.limit(limit)
             
-            complaints = []
-            for doc in query.stream():
-                data = doc.to_dict()
-                data['id'] = doc.id
-                complaints.append(data)
-            return complaints
+            return [_complaint_from_doc(doc) for doc in query.stream()]
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error getting complaints: {e}")
             return []
     
+    @staticmethod
+    def iter_all(page_size=500):
+        """Yield every complaint one page at a time instead of loading them all"""
+        try:
+            for doc in _paginate(db.collection(COMPLAINTS_COLLECTION), page_size):
+                yield _complaint_from_doc(doc)
+        except Exception as e:
+            logger.error(f"Error iterating complaints: {e}")
+    
     @staticmethod
     def update(complaint_id, update_data):
         """Update complaint"""
@@ -253,35 +335,65 @@ class Complaint:
             return None
     
     @staticmethod
-    def count():
-        """Count total complaints"""
+    def count(strict=False):
+        """Count total complaints (strict=True raises instead of returning 0)"""
         try:
-            complaints = db.collection(COMPLAINTS_COLLECTION).get()
-            return len(list(complaints))
+            return _count(db.collection(COMPLAINTS_COLLECTION))
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error counting complaints: {e}")
             return 0
     
     @staticmethod
-    def count_by_severity(severity):
-        """Count complaints by severity"""
+    def count_by_severity(severity, strict=False):
+        """Count complaints by severity (strict=True raises instead of returning 0)"""
         try:
-            complaints = db.collection(COMPLAINTS_COLLECTION).where('severity', '==', severity).get()
-            return len(list(complaints))
+            return _count(db.collection(COMPLAINTS_COLLECTION).where('severity', '==', severity))
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error counting by severity: {e}")
             return 0
     
     @staticmethod
-    def count_by_category(category):
-        """Count complaints by category"""
+    def count_by_category(category, strict=False):
+        """Count complaints by category (strict=True raises instead of returning 0)"""
         try:
-            complaints = db.collection(COMPLAINTS_COLLECTION).where('category', '==', category).get()
-            return len(list(complaints))
+            return _count(db.collection(COMPLAINTS_COLLECTION).where('category', '==', category))
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error counting by category: {e}")
             return 0
     
+    @staticmethod
+    def count_since(since, strict=False):
+        """Count complaints submitted at or after the given datetime (strict=True raises instead of returning 0)"""
+        try:
+            return _count(db.collection(COMPLAINTS_COLLECTION).where('timestamp', '>=', since))
+        except Exception as e:
+            if strict:
+                raise
+            logger.error(f"Error counting recent complaints: {e}")
+            return 0
+    
+    @staticmethod
+    def get_recent(since, fields=None):
+        """Get complaints submitted at or after the given datetime, newest first
+        
+        Pass `fields` to download only those fields (a Firestore projection).
+        """
+        try:
+            query = db.collection(COMPLAINTS_COLLECTION).where('timestamp', '>=', since).order_by('timestamp', direction=firestore.Query.DESCENDING)
+            if fields:
+                query = query.select(fields)
+            
+            return [_complaint_from_doc(doc) for doc in query.stream()]
+        except Exception as e:
+            logger.error(f"Error getting recent complaints: {e}")
+            return []
+    
     @staticmethod
     def get_by_cluster(cluster_id, limit=None):
         """Get complaints by cluster ID"""
@@ -290,16 +402,35 @@ class Complaint:
             if limit:
                 query = query.limit(limit)
             
-            complaints = []
-            for doc in query.stream():
-                data = doc.to_dict()
-                data['id'] = doc.id
-                complaints.append(data)
-            return complaints
+            return [_complaint_from_doc(doc) for doc in query.stream()]
         except Exception as e:
             logger.error(f"Error getting complaints by cluster: {e}")
             return []
     
+    @staticmethod
+    def get_by_clusters(cluster_ids, strict=False):
+        """Get complaints for several clusters in as few queries as possible
+        
+        Returns a dict of cluster_id -> complaints (newest first); every
+        requested cluster gets an entry, empty if it has no complaints.
+        strict=True raises Firestore errors instead of returning partial results.
+        """
+        cluster_ids = list(cluster_ids)
+        grouped = {cluster_id: [] for cluster_id in cluster_ids}
+        try:
+            # Firestore caps 'in' filters at 30 values per query
+            for start in range(0, len(cluster_ids), 30):
+                chunk = cluster_ids[start:start + 30]
+                query = db.collection(COMPLAINTS_COLLECTION).where('cluster_id', 'in', chunk).order_by('timestamp', direction=firestore.Query.DESCENDING)
+                for doc in query.stream():
+                    data = _complaint_from_doc(doc)
+                    grouped[data['cluster_id']].append(data)
+        except Exception as e:
+            if strict:
+                raise
+            logger.error(f"Error getting complaints by clusters: {e}")
+        return grouped
+    
     @staticmethod
     def set_embedding(complaint_id, embedding_array):
         """Store numpy array as base64 string"""
@@ -333,6 +464,11 @@ class Complaint:
 # CATEGORY OPERATIONS
 # ============================================================================
 
+# Categories are read on every submit form and dashboard load but almost
+# never change; writes through this model clear the cache
+CATEGORY_CACHE_TTL = 300
+_category_cache = TTLCache(ttl=CATEGORY_CACHE_TTL, maxsize=1)
+
 class Category:
     """Category model for Firestore"""
     
@@ -348,6 +484,7 @@ class Category:
             doc_ref = db.collection(CATEGORIES_COLLECTION).document()
             data['id'] = doc_ref.id
             doc_ref.set(data)
+            _category_cache.clear()
             
             logger.info(f"Created category: {name}")
             return data
@@ -356,16 +493,55 @@ class Category:
             return None
     
     @staticmethod
-    def get_all():
-        """Get all categories"""
+    def create_many(names):
+        """Create several categories in a single batched write"""
+        try:
+            batch = db.batch()
+            created = []
+            now = datetime.utcnow()
+            for name in names:
+                doc_ref = db.collection(CATEGORIES_COLLECTION).document()
+                data = {
+                    'id': doc_ref.id,
+                    'name': name,
+                    'description': None,
+                    'created_at': now
+                }
+                batch.set(doc_ref, data)
+                created.append(data)
+            batch.commit()
+            _category_cache.clear()
+            
+            logger.info(f"Created {len(created)} categories")
+            return created
+        except Exception as e:
+            logger.error(f"Error creating categories: {e}")
+            return []
+    
+    @staticmethod
+    def get_all(strict=False):
+        """Get all categories (served from a short-lived cache when possible)
+        
+        strict=True raises Firestore errors instead of returning an empty list.
+        """
+        cached = _category_cache.get('all')
+        if cached is not None:
+            return [dict(category) for category in cached]
+        
         try:
             categories = []
             for doc in db.collection(CATEGORIES_COLLECTION).stream():
                 data = doc.to_dict()
                 data['id'] = doc.id
                 categories.append(data)
+            # An empty result isn't cached: categories seeded by another
+            # instance or the console should show up on the next call
+            if categories:
+                _category_cache.set('all', [dict(category) for category in categories])
             return categories
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error getting categories: {e}")
             return []
     
@@ -387,8 +563,7 @@ class Category:
     def count():
         """Count categories"""
         try:
-            categories = db.collection(CATEGORIES_COLLECTION).get()
-            return len(list(categories))
+            return _count(db.collection(CATEGORIES_COLLECTION))
         except Exception as e:
             logger.error(f"Error counting categories: {e}")
             return 0
@@ -432,8 +607,24 @@ class IssueCluster:
             return None
     
     @staticmethod
-    def get_all(limit=None):
-        """Get all clusters"""
+    def get_many(cluster_ids):
+        """Get several clusters in one round trip, keyed by ID (missing IDs omitted)"""
+        try:
+            refs = [db.collection(CLUSTERS_COLLECTION).document(cid) for cid in cluster_ids]
+            clusters = {}
+            for doc in db.get_all(refs):
+                if doc.exists:
+                    data = doc.to_dict()
+                    data['id'] = doc.id
+                    clusters[doc.id] = data
+            return clusters
+        except Exception as e:
+            logger.error(f"Error getting clusters: {e}")
+            return {}
+    
+    @staticmethod
+    def get_all(limit=None, strict=False):
+        """Get all clusters (strict=True raises instead of returning [])"""
         try:
             query = db.collection(CLUSTERS_COLLECTION).order_by('count', direction=firestore.Query.DESCENDING)
             if limit:
@@ -446,6 +637,8 @@ class IssueCluster:
                 clusters.append(data)
             return clusters
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error getting clusters: {e}")
             return []
     
@@ -501,12 +694,13 @@ class IssueCluster:
             return False
     
     @staticmethod
-    def count():
-        """Count clusters"""
+    def count(strict=False):
+        """Count clusters (strict=True raises instead of returning 0)"""
         try:
-            clusters = db.collection(CLUSTERS_COLLECTION).get()
-            return len(list(clusters))
+            return _count(db.collection(CLUSTERS_COLLECTION))
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error counting clusters: {e}")
             return 0
 
@@ -518,21 +712,10 @@ def initialize_categories():
     """Initialize default categories"""
     try:
         if Category.count() == 0:
-            default_categories = [
-                'Mess Food Quality',
-                'Campus Wi-Fi',
-                'Medical Center',
-                'Placement/CDC',
-                'Faculty Concerns',
-                'Hostel Maintenance',
-                'Other'
-            ]
+            created = Category.create_many(DEFAULT_CATEGORIES)
             
-            for cat_name in default_categories:
-                Category.create(cat_name)
-            
-            logger.info(f"Initialized {len(default_categories)} categories")
-            return True
+            logger.info(f"Initialized {len(created)} categories")
+            return bool(created)
         return True
     except Exception as e:
         logger.error(f"Error initializing categories: {e}")
@@ -0,0 +1,15 @@
+"""
+Shared pytest fixtures for the Firestore test scripts
+"""
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def db():
+    """Firestore client shared by every test, initialized and warmed up once"""
+    from database.firebase_models import db as firestore_db
+    
+    # The first request pays for the gRPC channel and token exchange
+    firestore_db.collection('_warmup').limit(1).get()
+    return firestore_db
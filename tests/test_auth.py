@@ -3,14 +3,19 @@ Debug script to test authentication system
 Run this to verify user creation and session handling
 """
 
-from database.firebase_models import User
+from database.firebase_models import User, db
 from auth.auth import login_user
 from flask import Flask, session
+from functools import lru_cache
 import logging
+import sys
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cached for this script only; the app itself always reads users fresh
+get_user_by_email = lru_cache(maxsize=1024)(User.get_by_email)
+
 def test_authentication():
     """Test the complete authentication flow"""
     print("=" * 60)
@@ -21,7 +26,7 @@ def test_authentication():
     # Step 1: Check if any users exist
     print("Step 1: Checking existing users...")
     test_email = "test@vitapstudent.ac.in"
-    user = User.get_by_email(test_email)
+    user = get_user_by_email(test_email)
     
     if user:
         print(f"✓ Found existing user: {user['email']}")
@@ -45,6 +50,7 @@ def test_authentication():
         }
         
         user = User.create(user_data)
+        get_user_by_email.cache_clear()
         
         if user:
             print(f"✓ Test user created: {user['email']}")
@@ -86,7 +92,7 @@ def test_authentication():
             return False
 
 
-def check_all_users():
+def check_all_users(db):
     """List all users in the database"""
     print()
     print("=" * 60)
@@ -94,19 +100,23 @@ def check_all_users():
     print("=" * 60)
     
     try:
-        from firebase_admin import firestore
-        db = firestore.client()
-        users = db.collection('users').stream()
+        # Only fetch the fields printed below
+        users = db.collection('users').select(
+            ['name', 'email', 'student_id', 'is_google', 'created_at']
+        ).stream()
         
         count = 0
-        for doc in users:
-            count += 1
+        lines = []
+        for count, doc in enumerate(users, 1):
             data = doc.to_dict()
-            print(f"\n{count}. {data.get('name')}")
-            print(f"   Email: {data.get('email')}")
-            print(f"   Student ID: {data.get('student_id')}")
-            print(f"   Is Google: {data.get('is_google', False)}")
-            print(f"   Created: {data.get('created_at')}")
+            lines.append(
+                f"\n{count}. {data.get('name')}\n"
+                f"   Email: {data.get('email')}\n"
+                f"   Student ID: {data.get('student_id')}\n"
+                f"   Is Google: {data.get('is_google', False)}\n"
+                f"   Created: {data.get('created_at')}\n"
+            )
+        sys.stdout.write(''.join(lines))
         
         print()
         print(f"Total users: {count}")
@@ -121,7 +131,7 @@ if __name__ == "__main__":
     success = test_authentication()
     
     # List all users
-    check_all_users()
+    check_all_users(db)
     
     if success:
         print()
@@ -3,19 +3,14 @@ load_dotenv()
 
 import firebase_admin
 from firebase_admin import credentials, firestore
+import functools
 import os
 
-print("Testing Firebase Connection...")
-print("=" * 60)
 
-# Method 1: Try service account file first
-if os.path.exists('firebase_service_account.json'):
-    print("✓ Found firebase_service_account.json")
-    cred = credentials.Certificate('firebase_service_account.json')
-else:
-    # Method 2: Use environment variables
-    print("✓ Using environment variables")
-    service_account = {
+@functools.cache
+def _service_account():
+    """Build the service account info from environment variables (once per process)"""
+    return {
         "type": "service_account",
         "project_id": os.getenv("FIREBASE_PROJECT_ID"),
         "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
@@ -27,29 +22,46 @@ else:
         "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
         "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_CERT_URL")
     }
-    cred = credentials.Certificate(service_account)
 
-# Initialize
-firebase_admin.initialize_app(cred)
-print("✓ Firebase Admin initialized")
+
+print("Testing Firebase Connection...")
+print("=" * 60)
+
+if firebase_admin._apps:
+    # Another test module already initialized the default app; reuse its credential
+    print("✓ Reusing existing Firebase Admin app")
+else:
+    # Method 1: Try service account file first
+    if os.path.exists('firebase_service_account.json'):
+        print("✓ Found firebase_service_account.json")
+        cred = credentials.Certificate('firebase_service_account.json')
+    else:
+        # Method 2: Use environment variables
+        print("✓ Using environment variables")
+        cred = credentials.Certificate(_service_account())
+    
+    # Initialize
+    firebase_admin.initialize_app(cred)
+    print("✓ Firebase Admin initialized")
 
 # Test Firestore
 db = firestore.client()
 print("✓ Firestore client created")
 
-# Test write
+# Test write + cleanup in a single batched commit
 test_ref = db.collection('test').document('test_doc')
-test_ref.set({'message': 'Hello from CICP!', 'timestamp': firestore.SERVER_TIMESTAMP})
-print("✓ Test write successful")
+batch = db.batch()
+batch.set(test_ref, {'message': 'Hello from CICP!', 'timestamp': firestore.SERVER_TIMESTAMP})
+batch.delete(test_ref)
+write_results = batch.commit()
+# Only the set carries an update_time; Firestore leaves it unset for deletes
+assert write_results[0].update_time is not None
+print(f"✓ Test write successful (committed at {write_results[0].update_time})")
 
-# Test read
+# Test read: the batch's delete must be visible, which also confirms cleanup
 doc = test_ref.get()
-if doc.exists:
-    print(f"✓ Test read successful: {doc.to_dict()}")
-
-# Clean up
-test_ref.delete()
-print("✓ Test cleanup successful")
+assert not doc.exists
+print("✓ Test read successful (test document cleaned up)")
 
 print("=" * 60)
 print("🎉 Firebase is working perfectly!")
\ No newline at end of file
@@ -1,10 +1,14 @@
 """
 Test script to check profile data
 Run this to verify user complaints are being fetched correctly
+Pass --stats to also scan every complaint for missing user_ids
 """
 
-from database.firebase_models import User, Complaint
+from database.firebase_models import User, Complaint, db
+import argparse
+import io
 import logging
+import sys
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,48 +22,50 @@ def test_profile_data():
     
     # Get all users
     try:
-        from firebase_admin import firestore
-        db = firestore.client()
-        users = list(db.collection('users').stream())
+        # Only the first few complaints feed the user_id diagnostics below
+        sample_complaints = Complaint.get_all(limit=5)
         
-        print(f"Found {len(users)} users in database")
-        print()
-        
-        if not users:
-            print("⚠️  No users found! Register first.")
-            return
-        
-        # Test each user's complaints
-        for user_doc in users:
-            user = user_doc.to_dict()
-            user['id'] = user_doc.id
+        # Test each user's complaints, streaming users page by page; strict so a
+        # Firestore error is reported below rather than looking like "no users"
+        user_count = 0
+        for user in User.iter_all(strict=True):
+            user_count += 1
             
-            print(f"User: {user['name']} ({user['email']})")
-            print(f"User ID: {user['id']}")
-            print()
+            # Buffer this user's report and write it out in one go
+            buf = io.StringIO()
+            
+            print(f"User: {user['name']} ({user['email']})", file=buf)
+            print(f"User ID: {user['id']}", file=buf)
+            print(file=buf)
             
-            # Method 1: Get all complaints and filter
-            print("Method 1: Filter all complaints by user_id")
-            all_complaints = Complaint.get_all()
-            user_complaints = [c for c in all_complaints if c.get('user_id') == user['id']]
-            print(f"  Found {len(user_complaints)} complaints")
+            # Method 1: Indexed query on user_id
+            print("Method 1: Query complaints by user_id", file=buf)
+            user_complaints = Complaint.get_by_user_id(user['id'])
+            print(f"  Found {len(user_complaints)} complaints", file=buf)
             
             if user_complaints:
                 for i, complaint in enumerate(user_complaints, 1):
-                    print(f"  {i}. {complaint.get('category')} - {complaint.get('severity')}")
-                    print(f"     Text: {complaint.get('rewritten_text', '')[:50]}...")
+                    print(f"  {i}. {complaint.get('category')} - {complaint.get('severity')}", file=buf)
+                    print(f"     Text: {complaint.get('rewritten_text', '')[:50]}...", file=buf)
             
-            print()
+            print(file=buf)
             
             # Check why complaints might be missing
-            print("Checking all complaints for user_id match:")
-            for complaint in all_complaints[:5]:  # Just first 5
-                print(f"  - Complaint user_id: {complaint.get('user_id')}")
-                print(f"    Matches: {complaint.get('user_id') == user['id']}")
+            print("Checking all complaints for user_id match:", file=buf)
+            for complaint in sample_complaints:
+                print(f"  - Complaint user_id: {complaint.get('user_id')}", file=buf)
+                print(f"    Matches: {complaint.get('user_id') == user['id']}", file=buf)
             
-            print()
-            print("-" * 60)
-            print()
+            print(file=buf)
+            print("-" * 60, file=buf)
+            print(file=buf)
+            
+            sys.stdout.write(buf.getvalue())
+            sys.stdout.flush()
+        
+        print(f"Found {user_count} users in database")
+        if not user_count:
+            print("⚠️  No users found! Register first.")
         
     except Exception as e:
         print(f"Error: {e}")
@@ -67,7 +73,7 @@ def test_profile_data():
         traceback.print_exc()
 
 
-def check_complaint_user_ids():
+def check_complaint_user_ids(db):
     """Check all complaint user_ids"""
     print("=" * 60)
     print("CHECKING COMPLAINT USER IDs")
@@ -75,18 +81,28 @@ def check_complaint_user_ids():
     print()
     
     try:
-        all_complaints = Complaint.get_all()
+        # Only the fields reported below; skips complaint text and embeddings
+        docs = db.collection('complaints').select(
+            ['user_id', 'category', 'student_id', 'timestamp']
+        ).stream()
+        all_complaints = []
+        for doc in docs:
+            complaint = doc.to_dict()
+            complaint['id'] = doc.id
+            all_complaints.append(complaint)
         
         print(f"Total complaints: {len(all_complaints)}")
         print()
         
         user_id_stats = {}
+        orphaned = []
         for complaint in all_complaints:
             user_id = complaint.get('user_id')
             if user_id:
                 user_id_stats[user_id] = user_id_stats.get(user_id, 0) + 1
             else:
                 user_id_stats['None'] = user_id_stats.get('None', 0) + 1
+                orphaned.append(complaint)
         
         print("Complaints by user_id:")
         for user_id, count in user_id_stats.items():
@@ -101,11 +117,10 @@ def check_complaint_user_ids():
             
             # Show these complaints
             print("Complaints without user_id:")
-            for complaint in all_complaints:
-                if not complaint.get('user_id'):
-                    print(f"  - {complaint.get('id')}: {complaint.get('category')}")
-                    print(f"    Student ID: {complaint.get('student_id')}")
-                    print(f"    Timestamp: {complaint.get('timestamp')}")
+            for complaint in orphaned:
+                print(f"  - {complaint.get('id')}: {complaint.get('category')}")
+                print(f"    Student ID: {complaint.get('student_id')}")
+                print(f"    Timestamp: {complaint.get('timestamp')}")
         
     except Exception as e:
         print(f"Error: {e}")
@@ -114,6 +129,12 @@ def check_complaint_user_ids():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check profile data in Firestore")
+    parser.add_argument('--stats', action='store_true',
+                        help="also scan all complaints for missing user_ids")
+    args = parser.parse_args()
+    
     test_profile_data()
-    print()
-    check_complaint_user_ids()
\ No newline at end of file
+    if args.stats:
+        print()
+        check_complaint_user_ids(db)
\ No newline at end of file
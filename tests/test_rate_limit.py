@@ -3,24 +3,78 @@ Test script to verify rate limiting is working
 Run this while your Flask app is running
 """
 
+import pytest
 import requests
+from requests.adapters import HTTPAdapter
+import sys
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://127.0.0.1:8080/"
 
+# CSRF token patterns, compiled once for every attempt.
+# [^>]* keeps the input match inside one tag, so a miss fails fast
+# instead of rescanning the rest of the page.
+CSRF_INPUT_RE = re.compile(r'name="csrf_token"[^>]*?value="([^"]+)"')
+CSRF_META_RE = re.compile(r'<meta name="csrf-token" content="([^"]+)"')
+
+# One keep-alive connection pool shared by every session, sized for the bursts
+HTTP_ADAPTER = HTTPAdapter(pool_connections=50, pool_maxsize=50)
+
+
+def new_session():
+    """Create a session with its own cookies on top of the shared connection pool"""
+    session = requests.Session()
+    session.mount('http://', HTTP_ADAPTER)
+    session.mount('https://', HTTP_ADAPTER)
+    return session
+
+
+def clone_session(template):
+    """Create a pooled session that starts with a copy of template's cookies"""
+    session = new_session()
+    session.cookies.update(template.cookies)
+    return session
+
+
+# Cookie-less checks below all go through this one session
+http = new_session()
+
+
+def wait_for_server(timeout=5):
+    """Poll BASE_URL with exponential backoff until the app answers or timeout expires"""
+    deadline = time.monotonic() + timeout
+    backoff = 0.05
+    while time.monotonic() < deadline:
+        try:
+            if http.get(BASE_URL, timeout=0.5).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(backoff)
+        backoff *= 2
+    return False
+
+
+@pytest.fixture(scope='module', autouse=True)
+def require_server():
+    """Skip this module under pytest when the Flask app is not running"""
+    if not wait_for_server():
+        pytest.skip("server not running")
+
 
 def get_csrf_token(session, url):
     """Extract CSRF token from a page"""
     try:
         response = session.get(url)
         # Look for CSRF token in meta tag or hidden input
-        match = re.search(r'name="csrf_token".*?value="([^"]+)"', response.text)
+        match = CSRF_INPUT_RE.search(response.text)
         if match:
             return match.group(1)
         
         # Try meta tag
-        match = re.search(r'<meta name="csrf-token" content="([^"]+)"', response.text)
+        match = CSRF_META_RE.search(response.text)
         if match:
             return match.group(1)
         
@@ -30,6 +84,13 @@ def get_csrf_token(session, url):
         return None
 
 
+def send_burst(send, attempts):
+    """Run send(attempt) for every attempt concurrently, results in attempt order"""
+    attempts = list(attempts)
+    with ThreadPoolExecutor(max_workers=len(attempts)) as executor:
+        return list(executor.map(send, attempts))
+
+
 def test_login_rate_limit():
     """Test login endpoint rate limiting"""
     print("=" * 60)
@@ -37,15 +98,13 @@ def test_login_rate_limit():
     print("=" * 60)
     print()
     
-    # Try to login 7 times (should fail on 6th attempt)
-    for i in range(1, 8):
-        print(f"Attempt {i}...")
-        
-        # Create new session for each attempt
-        session = requests.Session()
-        
-        # Get CSRF token
-        csrf_token = get_csrf_token(session, f"{BASE_URL}/login")
+    # Fetch the login form once; its CSRF token is bound to this session's cookie
+    template = new_session()
+    csrf_token = get_csrf_token(template, f"{BASE_URL}/login")
+    
+    def attempt(i):
+        # Each attempt gets its own copy of the cookies that back the token
+        session = clone_session(template)
         
         data = {
             'identifier': 'test@example.com',
@@ -55,19 +114,23 @@ def test_login_rate_limit():
         if csrf_token:
             data['csrf_token'] = csrf_token
         
-        response = session.post(
+        return session.post(
             f"{BASE_URL}/login",
             data=data,
             allow_redirects=False
         )
-        
+    
+    # Fire 7 login attempts at once (only 5 should get through)
+    responses = send_burst(attempt, range(1, 8))
+    
+    for i, response in enumerate(responses, 1):
+        print(f"Attempt {i}...")
         print(f"  Status Code: {response.status_code}")
         
         if response.status_code == 429:
-            print(f"  ✓ Rate limit triggered on attempt {i}")
+            print(f"  ✓ Attempt {i} was rate limited")
             if 'Retry-After' in response.headers:
                 print(f"  Retry-After: {response.headers['Retry-After']}")
-            break
         elif response.status_code == 200 or response.status_code == 302:
             print(f"  ✓ Request {i} processed (login failed as expected)")
         elif response.status_code == 500:
@@ -75,9 +138,9 @@ def test_login_rate_limit():
             print(f"  Response: {response.text[:200]}")
         else:
             print(f"  Response: {response.status_code}")
-        
-        time.sleep(0.5)
     
+    limited = sum(1 for response in responses if response.status_code == 429)
+    print(f"\n{limited} of {len(responses)} attempts were rate limited")
     print()
 
 
@@ -88,15 +151,13 @@ def test_register_rate_limit():
     print("=" * 60)
     print()
     
-    # Try to register 5 times (should fail on 4th attempt)
-    for i in range(1, 6):
-        print(f"Attempt {i}...")
-        
-        # Create new session
-        session = requests.Session()
-        
-        # Get CSRF token
-        csrf_token = get_csrf_token(session, f"{BASE_URL}/register")
+    # Fetch the registration form once; its CSRF token is bound to this session's cookie
+    template = new_session()
+    csrf_token = get_csrf_token(template, f"{BASE_URL}/register")
+    
+    def attempt(i):
+        # Each attempt gets its own copy of the cookies that back the token
+        session = clone_session(template)
         
         data = {
             'name': 'Test User',
@@ -109,26 +170,30 @@ def test_register_rate_limit():
         if csrf_token:
             data['csrf_token'] = csrf_token
         
-        response = session.post(
+        return session.post(
             f"{BASE_URL}/register",
             data=data,
             allow_redirects=False
         )
-        
+    
+    # Fire 5 registrations at once (only 3 should get through)
+    responses = send_burst(attempt, range(1, 6))
+    
+    for i, response in enumerate(responses, 1):
+        print(f"Attempt {i}...")
         print(f"  Status Code: {response.status_code}")
         
         if response.status_code == 429:
-            print(f"  ✓ Rate limit triggered on attempt {i}")
-            break
+            print(f"  ✓ Attempt {i} was rate limited")
         elif response.status_code == 200 or response.status_code == 302:
             print(f"  ✓ Request {i} processed")
         elif response.status_code == 500:
             print(f"  ✗ Server error - check Flask console logs")
         else:
             print(f"  Response: {response.status_code}")
-        
-        time.sleep(0.5)
     
+    limited = sum(1 for response in responses if response.status_code == 429)
+    print(f"\n{limited} of {len(responses)} attempts were rate limited")
     print()
 
 
@@ -139,28 +204,29 @@ def test_upvote_rate_limit():
     print("=" * 60)
     print()
     
-    # Try to upvote 35 times (should fail after 30)
     fake_complaint_id = "test_complaint_123"
     
-    for i in range(1, 36):
-        response = requests.post(
+    def attempt(i):
+        # Separate session per thread; connections still come from the shared pool
+        return new_session().post(
             f"{BASE_URL}/complaint/{fake_complaint_id}/upvote",
             headers={'Content-Type': 'application/json'}
         )
-        
-        if response.status_code == 429:
-            print(f"✓ Rate limit triggered on attempt {i}")
-            print(f"  This is correct - limit is 30 per minute")
-            try:
-                data = response.json()
-                print(f"  Error message: {data.get('error')}")
-            except:
-                pass
-            break
-        elif i % 10 == 0:
-            print(f"  Attempt {i}: {response.status_code}")
-        
-        time.sleep(0.05)
+    
+    # Fire 35 upvotes at once (only 30 should get through, even under a race)
+    responses = send_burst(attempt, range(1, 36))
+    
+    limited = [r for r in responses if r.status_code == 429]
+    print(f"  {len(responses) - len(limited)} accepted, {len(limited)} rate limited")
+    
+    if limited:
+        print("✓ Rate limit triggered")
+        print("  This is correct - limit is 30 per minute")
+        try:
+            data = limited[0].json()
+            print(f"  Error message: {data.get('error')}")
+        except:
+            pass
     
     print()
 
@@ -172,27 +238,35 @@ def test_simple_rate_limit():
     print("=" * 60)
     print()
     
-    print("Attempting to access /test-rate-limit 5 times...")
-    print("(Should succeed 3 times, then get rate limited)")
+    limit = 3
+    print("Accessing /test-rate-limit back to back until rate limited...")
+    print(f"(Should succeed {limit} times, then get rate limited)")
     print()
     
-    for i in range(1, 6):
-        response = requests.get(f"{BASE_URL}/test-rate-limit")
+    # No pacing: stop at the first 429, or once the limiter window (60s) is spent
+    start = time.monotonic()
+    successes = 0
+    attempt = 0
+    while time.monotonic() - start < 60 and attempt < limit + 2:
+        attempt += 1
+        response = http.get(f"{BASE_URL}/test-rate-limit")
         
-        print(f"Attempt {i}: {response.status_code}", end="")
+        print(f"Attempt {attempt}: {response.status_code}", end="")
         
         if response.status_code == 429:
             print(f" - ✓ Rate limited!")
             break
         elif response.status_code == 200:
+            successes += 1
             print(f" - ✓ Success")
         elif response.status_code == 404:
             print(f" - Route not found (add test route to app.py)")
             break
         else:
             print(f" - Unexpected: {response.status_code}")
-        
-        time.sleep(0.5)
+    
+    if response.status_code == 429 and successes != limit:
+        print(f"⚠️  Expected {limit} successes before the limit, got {successes}")
     
     print()
 
@@ -204,7 +278,7 @@ def check_rate_limit_headers():
     print("=" * 60)
     print()
     
-    response = requests.get(f"{BASE_URL}/")
+    response = http.get(f"{BASE_URL}/")
     
     print("Response headers related to rate limiting:")
     rate_limit_headers = {}
@@ -224,10 +298,9 @@ def check_rate_limit_headers():
 if __name__ == "__main__":
     print("🧪 RATE LIMITING TEST SUITE (WITH CSRF)")
     print()
-    print("Make sure your Flask app is running on http://127.0.0.1:8080/")
-    print()
-    input("Press Enter to start tests...")
-    print()
+    if not wait_for_server():
+        print(f"❌ No server responding at {BASE_URL} - start the Flask app first")
+        sys.exit(1)
     
     # Run tests
     check_rate_limit_headers()
@@ -4,7 +4,7 @@ Tests various complaint scenarios to ensure correct severity classification.
 """
 
 import sys
-from ai.severity import detect_severity, explain_severity
+from ai.severity import detect_severity, detect_batch_severity, explain_severity
 
 # Test cases with expected severity levels
 TEST_CASES = [
@@ -221,14 +221,14 @@ def run_severity_tests():
     
     failures = []
     
-    for i, test in enumerate(TEST_CASES, 1):
+    # Detect severity for every case in one batch
+    detections = detect_batch_severity(test["complaint"] for test in TEST_CASES)
+    
+    for i, (test, detected) in enumerate(zip(TEST_CASES, detections), 1):
         complaint = test["complaint"]
         expected = test["expected"]
         category = test["category"]
         
-        # Detect severity
-        detected = detect_severity(complaint)
-        
         # Check if correct
         is_correct = detected == expected
         
@@ -3,105 +3,168 @@ Helper functions for Firebase Firestore operations
 FIXED VERSION with better error handling
 """
 from database.firebase_models import Complaint, IssueCluster, Category
-from datetime import datetime, timedelta
+from utils.cache import TTLCache
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
 import logging
+import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+_UTC = timezone.utc
+
+# Cheap shape check so obviously malformed strings skip the raise/unwind of a failed parse
+_ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# format_timestamp: anything older than this shows as a date
+_ABSOLUTE_AFTER_SECONDS = 8 * 86400
+
+# format_timestamp: (unit length in seconds, unit name), largest first
+_RELATIVE_UNITS = (
+    (86400, 'day'),
+    (3600, 'hour'),
+    (60, 'minute'),
+)
+
+# CSS color class per severity level
+_SEVERITY_COLORS = {
+    'high': 'danger',
+    'medium': 'warning',
+    'low': 'success'
+}
+
+# Student IDs that are shown as "Anonymous" outright
+_ANONYMOUS_IDS = frozenset({None, '', 'anonymous'})
+
+# Fields the dashboard's recent-complaints list renders (skips embeddings and raw text)
+RECENT_COMPLAINT_FIELDS = ['category', 'severity', 'rewritten_text', 'student_id', 'timestamp', 'upvotes']
+
+# Dashboard refreshes within this window reuse the last computed stats / page data
+DASHBOARD_STATS_TTL = 30
+_dashboard_stats_cache = TTLCache(ttl=DASHBOARD_STATS_TTL, maxsize=4)
+
+# Bumped on every invalidation; results computed under an older generation
+# are not cached, so a load that started before a submit can't undo it
+_dashboard_generation = 0
+_dashboard_lock = threading.Lock()
+
+
+def invalidate_dashboard_stats():
+    """Drop cached dashboard stats and page data, e.g. after a new complaint is submitted"""
+    global _dashboard_generation
+    with _dashboard_lock:
+        _dashboard_generation += 1
+        _dashboard_stats_cache.clear()
+
+
+def _cache_dashboard(generation, key, value):
+    """Cache a dashboard result unless the cache was invalidated since `generation`"""
+    with _dashboard_lock:
+        if generation == _dashboard_generation:
+            _dashboard_stats_cache.set(key, value)
+
+
+def _empty_dashboard_stats():
+    """Zeroed stats shown when Firestore can't be reached"""
+    return {
+        'total_complaints': 0,
+        'severity_stats': {'high': 0, 'medium': 0, 'low': 0},
+        'category_stats': {},
+        'total_clusters': 0,
+        'recent_complaints': 0,
+        'top_categories': []
+    }
+
+
 def get_dashboard_stats():
     """
     Get statistics for the admin dashboard.
     
+    Results are cached for DASHBOARD_STATS_TTL seconds.
+    
     Returns:
         dict: Dashboard statistics
     """
+    cached = _dashboard_stats_cache.get('stats')
+    if cached is not None:
+        return cached
+    
+    generation = _dashboard_generation
     try:
-        logger.info("Getting dashboard stats...")
-        
-        # Total complaints
-        all_complaints = Complaint.get_all()
-        total_complaints = len(all_complaints)
-        
-        logger.info(f"Found {total_complaints} total complaints")
-        
-        # Complaints by severity
-        severity_stats = {
-            'high': sum(1 for c in all_complaints if c.get('severity') == 'high'),
-            'medium': sum(1 for c in all_complaints if c.get('severity') == 'medium'),
-            'low': sum(1 for c in all_complaints if c.get('severity') == 'low')
-        }
-        
-        logger.info(f"Severity: high={severity_stats['high']}, medium={severity_stats['medium']}, low={severity_stats['low']}")
-        
-        # Complaints by category
-        category_stats = {}
-        categories = Category.get_all()
-        for cat in categories:
-            count = sum(1 for c in all_complaints if c.get('category') == cat['name'])
-            if count > 0:
-                category_stats[cat['name']] = count
-        
-        logger.info(f"Categories: {category_stats}")
-        
-        # Active clusters
-        total_clusters = IssueCluster.count()
-        logger.info(f"Total clusters: {total_clusters}")
-        
-        # Recent activity (last 7 days)
-        from datetime import timezone
-        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-        recent_complaints = 0
-        
-        for c in all_complaints:
-            timestamp = c.get('timestamp')
-            if timestamp:
-                if isinstance(timestamp, datetime):
-                    # Make timezone-aware if it isn't already
-                    if timestamp.tzinfo is None:
-                        timestamp = timestamp.replace(tzinfo=timezone.utc)
-                    if timestamp >= week_ago:
-                        recent_complaints += 1
-                elif isinstance(timestamp, str):
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        if dt.tzinfo is None:
-                            dt = dt.replace(tzinfo=timezone.utc)
-                        if dt >= week_ago:
-                            recent_complaints += 1
-                    except:
-                        pass
-        
-        logger.info(f"Recent complaints (7 days): {recent_complaints}")
-        
-        # Top categories
-        top_categories = sorted(
-            category_stats.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]
-        
-        stats = {
-            'total_complaints': total_complaints,
-            'severity_stats': severity_stats,
-            'category_stats': category_stats,
-            'total_clusters': total_clusters,
-            'recent_complaints': recent_complaints,
-            'top_categories': top_categories
-        }
-        
-        logger.info(f"Dashboard stats complete: {stats}")
-        return stats
-        
+        stats = _load_dashboard_stats()
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}", exc_info=True)
-        return {
-            'total_complaints': 0,
-            'severity_stats': {'high': 0, 'medium': 0, 'low': 0},
-            'category_stats': {},
-            'total_clusters': 0,
-            'recent_complaints': 0,
-            'top_categories': []
+        return _empty_dashboard_stats()
+    
+    _cache_dashboard(generation, 'stats', stats)
+    return stats
+
+
+def _load_dashboard_stats():
+    """Compute dashboard statistics, raising if any Firestore query fails"""
+    logger.info("Getting dashboard stats...")
+    
+    week_ago = datetime.now(_UTC) - timedelta(days=7)
+    categories = Category.get_all(strict=True)
+    
+    # Every figure is a server-side COUNT aggregation, so no complaint
+    # documents are downloaded; the queries are I/O bound and run concurrently.
+    # strict=True makes a failed query raise here instead of counting as 0,
+    # so a Firestore error is never cached as real zeros
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        total_future = executor.submit(Complaint.count, strict=True)
+        severity_futures = {
+            level: executor.submit(Complaint.count_by_severity, level, strict=True)
+            for level in ('high', 'medium', 'low')
+        }
+        category_futures = {
+            cat['name']: executor.submit(Complaint.count_by_category, cat['name'], strict=True)
+            for cat in categories
         }
+        clusters_future = executor.submit(IssueCluster.count, strict=True)
+        recent_future = executor.submit(Complaint.count_since, week_ago, strict=True)
+    
+    total_complaints = total_future.result()
+    logger.info(f"Found {total_complaints} total complaints")
+    
+    severity_stats = {level: future.result() for level, future in severity_futures.items()}
+    logger.info(f"Severity: high={severity_stats['high']}, medium={severity_stats['medium']}, low={severity_stats['low']}")
+    
+    # Only categories with at least one complaint
+    category_stats = {}
+    for name, future in category_futures.items():
+        count = future.result()
+        if count > 0:
+            category_stats[name] = count
+    
+    logger.info(f"Categories: {category_stats}")
+    
+    # Active clusters
+    total_clusters = clusters_future.result()
+    logger.info(f"Total clusters: {total_clusters}")
+    
+    # Recent activity (last 7 days)
+    recent_complaints = recent_future.result()
+    logger.info(f"Recent complaints (7 days): {recent_complaints}")
+    
+    # Top categories (partial heap selection instead of a full sort)
+    top_categories = Counter(category_stats).most_common(5)
+    
+    stats = {
+        'total_complaints': total_complaints,
+        'severity_stats': severity_stats,
+        'category_stats': category_stats,
+        'total_clusters': total_clusters,
+        'recent_complaints': recent_complaints,
+        'top_categories': top_categories
+    }
+    
+    logger.info(f"Dashboard stats complete: {stats}")
+    return stats
 
 
 def get_recent_complaints(limit=10):
@@ -112,35 +175,32 @@ def get_recent_complaints(limit=10):
         limit (int): Number of complaints to retrieve
         
     Returns:
-        list: List of complaint dicts
+        list: List of complaint dicts (id plus RECENT_COMPLAINT_FIELDS only)
     """
     try:
-        logger.info(f"Getting {limit} recent complaints...")
-        
-        complaints = Complaint.get_all(limit=limit)
-        
-        logger.info(f"Retrieved {len(complaints)} complaints")
-        
-        # Convert timestamp strings to datetime objects
-        for c in complaints:
-            if isinstance(c.get('timestamp'), str):
-                try:
-                    c['timestamp'] = datetime.fromisoformat(c['timestamp'].replace('Z', '+00:00'))
-                except:
-                    c['timestamp'] = datetime.utcnow()
-            elif c.get('timestamp') is None:
-                c['timestamp'] = datetime.utcnow()
-        
-        # Sort by timestamp descending
-        complaints.sort(key=lambda x: x.get('timestamp', datetime.min), reverse=True)
-        
-        return complaints[:limit]
-        
+        return _load_recent_complaints(limit)
     except Exception as e:
         logger.error(f"Error getting recent complaints: {e}", exc_info=True)
         return []
 
 
+def _load_recent_complaints(limit):
+    """Fetch the most recent complaints, raising if the Firestore query fails"""
+    logger.info(f"Getting {limit} recent complaints...")
+    
+    complaints = Complaint.get_all(limit=limit, fields=RECENT_COMPLAINT_FIELDS, strict=True)
+    
+    logger.info(f"Retrieved {len(complaints)} complaints")
+    
+    # Timestamps already come back as datetimes; fill in any missing ones for the template
+    for c in complaints:
+        if c['timestamp'] is None:
+            c['timestamp'] = datetime.utcnow()
+    
+    # Already newest first: get_all orders by timestamp desc and applies the limit server-side
+    return complaints
+
+
 def get_trending_issues(days=7, limit=5):
     """
     Get trending issues based on recent complaint volume.
@@ -153,44 +213,26 @@ def get_trending_issues(days=7, limit=5):
         list: List of (cluster, recent_count) tuples
     """
     try:
-        from datetime import timezone
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+        cutoff_date = datetime.now(_UTC) - timedelta(days=days)
         
         # Get all clusters
         clusters = IssueCluster.get_all()
+        if not clusters:
+            return []
         
-        trending = []
+        # One range query for the whole window (cluster_id only), grouped locally,
+        # instead of one query per cluster
+        recent = Complaint.get_recent(cutoff_date, fields=['cluster_id', 'timestamp'])
+        recent_counts = Counter(c.get('cluster_id') for c in recent if c.get('cluster_id'))
         
-        for cluster in clusters:
-            # Get recent complaints for this cluster
-            all_cluster_complaints = Complaint.get_by_cluster(cluster['id'])
-            
-            recent_count = 0
-            for c in all_cluster_complaints:
-                timestamp = c.get('timestamp')
-                if timestamp:
-                    if isinstance(timestamp, datetime):
-                        if timestamp.tzinfo is None:
-                            from datetime import timezone
-                            timestamp = timestamp.replace(tzinfo=timezone.utc)
-                        if timestamp >= cutoff_date:
-                            recent_count += 1
-                    elif isinstance(timestamp, str):
-                        try:
-                            from datetime import timezone
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                            if dt.tzinfo is None:
-                                dt = dt.replace(tzinfo=timezone.utc)
-                            if dt >= cutoff_date:
-                                recent_count += 1
-                        except:
-                            pass
-            
-            if recent_count > 0:
-                trending.append((cluster, recent_count))
+        trending = [
+            (cluster, recent_counts[cluster['id']])
+            for cluster in clusters
+            if recent_counts[cluster['id']]
+        ]
         
         # Sort by recent count
-        trending.sort(key=lambda x: x[1], reverse=True)
+        trending.sort(key=itemgetter(1), reverse=True)
         
         return trending[:limit]
         
@@ -199,12 +241,93 @@ def get_trending_issues(days=7, limit=5):
         return []
 
 
-def format_timestamp(timestamp):
+def get_dashboard_clusters(limit=20):
+    """
+    Get the largest clusters with their complaints attached.
+    
+    Args:
+        limit (int): Number of clusters to retrieve
+        
+    Returns:
+        list: Cluster dicts, each with a 'complaints' list (newest first)
+        
+    Raises:
+        Exception: If any Firestore query fails, rather than returning partial data
+    """
+    clusters = IssueCluster.get_all(limit=limit, strict=True)
+    
+    # One 'in' query for every cluster's complaints
+    cluster_complaints = Complaint.get_by_clusters((cluster['id'] for cluster in clusters), strict=True)
+    for cluster in clusters:
+        cluster['complaints'] = cluster_complaints[cluster['id']]
+    return clusters
+
+
+def get_dashboard_bundle(recent_limit=10, cluster_limit=20):
+    """
+    Get everything the admin dashboard renders in one call.
+    
+    Stats, clusters and recent complaints are loaded concurrently, and the
+    combined result is cached for DASHBOARD_STATS_TTL seconds under one key.
+    A part that fails to load is shown empty, and the bundle is not cached.
+    
+    Args:
+        recent_limit (int): Number of recent complaints to include
+        cluster_limit (int): Number of clusters to include
+        
+    Returns:
+        dict: {'stats': dict, 'clusters': list, 'recent': list}
+    """
+    key = ('bundle', recent_limit, cluster_limit)
+    cached = _dashboard_stats_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    generation = _dashboard_generation
+    stats = _dashboard_stats_cache.get('stats')
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        stats_future = executor.submit(_load_dashboard_stats) if stats is None else None
+        clusters_future = executor.submit(get_dashboard_clusters, cluster_limit)
+        recent_future = executor.submit(_load_recent_complaints, recent_limit)
+    
+    stats_ok = True
+    if stats_future is not None:
+        stats, stats_ok = _result_or(stats_future, _empty_dashboard_stats(), 'stats')
+        if stats_ok:
+            _cache_dashboard(generation, 'stats', stats)
+    clusters, clusters_ok = _result_or(clusters_future, [], 'clusters')
+    recent, recent_ok = _result_or(recent_future, [], 'recent complaints')
+    
+    bundle = {
+        'stats': stats,
+        'clusters': clusters,
+        'recent': recent
+    }
+    
+    # Only a fully loaded bundle is cached, and only if no submit or upvote
+    # invalidated the cache while it was loading
+    if stats_ok and clusters_ok and recent_ok:
+        _cache_dashboard(generation, key, bundle)
+    return bundle
+
+
+def _result_or(future, fallback, part):
+    """Return (result, True), or (fallback, False) if the dashboard part failed to load"""
+    try:
+        return future.result(), True
+    except Exception as e:
+        logger.error(f"Error getting dashboard {part}: {e}", exc_info=True)
+        return fallback, False
+
+
+def format_timestamp(timestamp, now=None):
     """
     Format timestamp for display.
     
     Args:
         timestamp (datetime or str): Timestamp to format
+        now (datetime): Reference time, defaults to the current UTC time
         
     Returns:
         str: Formatted timestamp
@@ -214,31 +337,33 @@ def format_timestamp(timestamp):
     
     # Convert string to datetime if needed
     if isinstance(timestamp, str):
+        if not _ISO_DATE_RE.match(timestamp):
+            return "Unknown"
         try:
             timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-        except:
+        except ValueError:
             return "Unknown"
     
     # Make timezone-aware if needed
-    from datetime import timezone
     if timestamp.tzinfo is None:
-        timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp = timestamp.replace(tzinfo=_UTC)
     
-    now = datetime.now(timezone.utc)
-    diff = now - timestamp
+    # A naive reference time is UTC too (datetime.utcnow()), not local time
+    if now is not None and now.tzinfo is None:
+        now = now.replace(tzinfo=_UTC)
     
-    if diff.days > 7:
-        return timestamp.strftime("%b %d, %Y")
-    elif diff.days > 0:
-        return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
-    elif diff.seconds >= 3600:
-        hours = diff.seconds // 3600
-        return f"{hours} hour{'s' if hours > 1 else ''} ago"
-    elif diff.seconds >= 60:
-        minutes = diff.seconds // 60
-        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-    else:
-        return "Just now"
+    # Everything below is integer epoch-second math (no timedelta objects)
+    now_epoch = int(time.time()) if now is None else int(now.timestamp())
+    timestamp_epoch = int(timestamp.timestamp())
+    seconds = now_epoch - timestamp_epoch
+    
+    if seconds >= _ABSOLUTE_AFTER_SECONDS:
+        return datetime.fromtimestamp(timestamp_epoch, _UTC).strftime("%b %d, %Y")
+    for unit_seconds, unit in _RELATIVE_UNITS:
+        if seconds >= unit_seconds:
+            count = seconds // unit_seconds
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+    return "Just now"
 
 
 def get_severity_color(severity):
@@ -251,12 +376,7 @@ def get_severity_color(severity):
     Returns:
         str: CSS color class
     """
-    colors = {
-        'high': 'danger',
-        'medium': 'warning',
-        'low': 'success'
-    }
-    return colors.get(severity, 'secondary')
+    return _SEVERITY_COLORS.get(severity, 'secondary')
 
 
 def anonymize_student_id(student_id):
@@ -269,11 +389,7 @@ def anonymize_student_id(student_id):
     Returns:
         str: Anonymized ID
     """
-    if not student_id or student_id == 'anonymous':
+    # Show only first 3 and last 2 characters; short IDs would reveal too much
+    if student_id in _ANONYMOUS_IDS or len(student_id) <= 5:
         return "Anonymous"
-    
-    # Show only first 3 and last 2 characters
-    if len(student_id) > 5:
-        return f"{student_id[:3]}***{student_id[-2:]}"
-    else:
-        return "Anonymous"
\ No newline at end of file
+    return f"{student_id[:3]}***{student_id[-2:]}"
\ No newline at end of file